@@ -68,8 +68,8 @@ int trace_tcp_connect(struct pt_regs *ctx) {
     // Get command line (simplified - just use comm for now)
     __builtin_memcpy(event.cmdline, event.comm, MAX_COMM_LEN);
 
-    // Send event to userspace via perf buffer
-    bpf_perf_event_output(ctx, &connections, BPF_F_CURRENT_CPU, &event, sizeof(event));
+    // Send event to userspace via the shared ring buffer
+    bpf_ringbuf_output(&connections, &event, sizeof(event), 0);
 
     return 0;
 }
@@ -106,8 +106,8 @@ int trace_inet_sock_set_state(struct trace_event_raw_inet_sock_set_state *ctx) {
     // Get command line (simplified)
     __builtin_memcpy(event.cmdline, event.comm, MAX_COMM_LEN);
 
-    // Send event to userspace via perf buffer
-    bpf_perf_event_output(ctx, &connections, BPF_F_CURRENT_CPU, &event, sizeof(event));
+    // Send event to userspace via the shared ring buffer
+    bpf_ringbuf_output(&connections, &event, sizeof(event), 0);
 
     return 0;
 }
\ No newline at end of file
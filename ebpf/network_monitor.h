@@ -27,12 +27,11 @@ struct connection_event_t {
     __u8 protocol;            // IP protocol (TCP=6)
 };
 
-// Perf buffer map for sending events to userspace
-struct bpf_map_def SEC("maps") connections = {
-    .type = BPF_MAP_TYPE_PERF_EVENT_ARRAY,
-    .key_size = sizeof(__u32),
-    .value_size = sizeof(__u32),
-};
+// Ring buffer map for sending events to userspace (kernel 5.8+)
+struct {
+    __uint(type, BPF_MAP_TYPE_RINGBUF);
+    __uint(max_entries, 256 * 1024);
+} connections SEC(".maps");
 
 // Helper function to get command line from task struct
 static __always_inline void get_cmdline(struct pt_regs *ctx, char *cmdline, size_t maxlen) {
@@ -1,5 +1,9 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 
+// The server sends orjson-encoded binary frames; decode them to UTF-8
+// before JSON.parse. One decoder instance is reused for every message.
+const utf8Decoder = new TextDecoder();
+
 interface Connection {
   id: string;
   timestamp: number;
@@ -111,6 +115,19 @@ const useWebSocket = (url: string): UseWebSocketReturn => {
     }
   }, []);
 
+  // Live batches prepend to the existing list (newest first), unlike the
+  // 'connections' reply which replaces it wholesale.
+  const handleConnectionBatch = useCallback((data: any) => {
+    if (data.connections) {
+      const transformed = data.connections.map(transformConnection).reverse();
+      setConnections(prev => [...transformed, ...prev].slice(0, 1000));
+      const suspicious = transformed.filter((c: Connection) => c.isSuspicious).length;
+      if (suspicious > 0) {
+        setThreatCount(prev => prev + suspicious);
+      }
+    }
+  }, []);
+
   const handleStatisticsData = useCallback((data: any) => {
     setStatistics(prev => ({ ...prev, ...data }));
   }, []);
@@ -118,6 +135,7 @@ const useWebSocket = (url: string): UseWebSocketReturn => {
   const handleMessage = useCallback((message: any) => {
     switch (message.type) {
       case 'connection': handleNewConnection(message.data); break;
+      case 'connection_batch': handleConnectionBatch(message.data); break;
       case 'initial_data': handleInitialData(message.data); break;
       case 'connections': handleConnectionsData(message.data); break;
       case 'statistics': handleStatisticsData(message.data); break;
@@ -125,7 +143,7 @@ const useWebSocket = (url: string): UseWebSocketReturn => {
       case 'error': console.error('Server error:', message.data.error); break;
       default: console.log('Unknown message type:', message.type);
     }
-  }, [handleNewConnection, handleInitialData, handleConnectionsData, handleStatisticsData]);
+  }, [handleNewConnection, handleConnectionBatch, handleInitialData, handleConnectionsData, handleStatisticsData]);
 
   const sendMessage = useCallback((message: any) => {
     if (wsRef.current?.readyState === WebSocket.OPEN) {
@@ -178,6 +196,7 @@ const useWebSocket = (url: string): UseWebSocketReturn => {
 
     try {
       const ws = new WebSocket(url);
+      ws.binaryType = 'arraybuffer';
       wsRef.current = ws;
 
       ws.onopen = () => {
@@ -191,7 +210,10 @@ const useWebSocket = (url: string): UseWebSocketReturn => {
 
       ws.onmessage = (event) => {
         try {
-          const message = JSON.parse(event.data);
+          const raw = typeof event.data === 'string'
+            ? event.data
+            : utf8Decoder.decode(event.data);
+          const message = JSON.parse(raw);
           handleMessage(message);
         } catch (error) {
           console.error('Error parsing WebSocket message:', error);
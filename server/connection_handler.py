@@ -4,38 +4,72 @@ Processes and manages network connection events from eBPF
 """
 
 import asyncio
+import heapq
 import logging
-import socket
-import struct
 import time
 from collections import deque, defaultdict
+from functools import lru_cache
 from typing import Dict, List, Optional, Any, Set
 from datetime import datetime, timedelta
 
+import numpy as np
 import psutil
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=65536)
+def _format_ipv4(ip_int: int) -> str:
+    """Format a host-order IPv4 integer as dotted-quad (cached, no syscalls)"""
+    return f"{(ip_int >> 24) & 0xFF}.{(ip_int >> 16) & 0xFF}.{(ip_int >> 8) & 0xFF}.{ip_int & 0xFF}"
+
 class ConnectionHandler:
     """Handles processing and storage of network connection events"""
 
+    # Private IPv4 ranges as (start, end) integer pairs: 10/8, 172.16/12,
+    # 192.168/16 and loopback 127/8
+    _PRIVATE_RANGES = (
+        (0x0A000000, 0x0AFFFFFF),
+        (0xAC100000, 0xAC1FFFFF),
+        (0xC0A80000, 0xC0A8FFFF),
+        (0x7F000000, 0x7FFFFFFF),
+    )
+
     def __init__(self, max_connections: int = 10000, retention_minutes: int = 5, threat_detector=None):
         self.max_connections = max_connections
         self.retention_minutes = retention_minutes
         self.threat_detector = threat_detector
         self.websocket_handler: Optional['WebSocketHandler'] = None
 
-        # In-memory storage for connections (sliding window)
-        self.connections: Dict[str, Dict[str, Any]] = {}
-        self.connection_queue = deque(maxlen=max_connections)
+        # In-memory storage for connections: a fixed-size ring buffer in
+        # struct-of-arrays layout. Hot numeric fields live in preallocated
+        # numpy columns so scans (cleanup, suspicious counts, per-pid
+        # filters) are single vectorized passes; the full enriched dicts sit
+        # in a parallel list indexed by the same ring position and are
+        # reclaimed automatically on overwrite.
+        self._ts = np.zeros(max_connections, dtype=np.int64)
+        self._pid = np.zeros(max_connections, dtype=np.int64)
+        self._daddr = np.zeros(max_connections, dtype=np.uint32)
+        self._dport = np.zeros(max_connections, dtype=np.uint16)
+        self._susp = np.zeros(max_connections, dtype=bool)
+        self._valid = np.zeros(max_connections, dtype=bool)
+        self._events: List[Optional[Dict[str, Any]]] = [None] * max_connections
+        self._write_idx = 0  # Monotonic; ring position is _write_idx % size
+
+        # Counters maintained on write/evict so stats reads never scan
+        self._active_count = 0
+        self._suspicious_count = 0
+
+        # Upper bound on tracked destination IPs before the map is trimmed
+        self._ip_frequency_max = 100_000
 
         # Process and IP statistics
         self.process_stats: Dict[int, Dict[str, Any]] = defaultdict(dict)
         self.ip_frequency: Dict[str, int] = defaultdict(int)
-        self.connection_rates: Dict[int, List[float]] = defaultdict(list)
+        self.connection_rates: Dict[int, deque] = defaultdict(deque)
 
-        # Thread safety
-        self.lock = asyncio.Lock()
+        # All state is owned by the single asyncio event loop: every mutation
+        # happens between awaits, so no lock is needed around dict/deque ops.
 
         # Statistics
         self.total_connections = 0
@@ -44,83 +78,122 @@ class ConnectionHandler:
         # Known safe ports
         self.safe_ports = {80, 443, 22, 53, 25, 587, 993, 995, 21, 110, 143, 995, 8080, 8443}
 
+        # Cache of psutil.Process handles keyed by pid. Hits are validated
+        # with is_running(), which re-reads the creation time from /proc,
+        # so a recycled pid is not mistaken for the old process
+        self._proc_cache: Dict[int, psutil.Process] = {}
+        self._proc_cache_max = 4096
+
+        # Process metadata sampled from procfs in the background so the hot
+        # event path never blocks on /proc I/O; refreshed every few seconds
+        self._pid_meta: Dict[int, Dict[str, Any]] = {}
+        self._pid_meta_interval = 5.0
+        self._pid_meta_task = asyncio.create_task(self._refresh_pid_meta_loop())
+
+        # Retention cleanup runs on its own timer so no single event ever
+        # pays the sweep cost in-line
+        self._cleanup_interval = 10.0
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def process_batch(self, events: List[Dict[str, Any]]):
+        """Process a batch of connection events drained in one poll pass"""
+        processed = []
+        for event in events:
+            enriched_event = await self._process_event(event)
+            if enriched_event is not None:
+                processed.append(enriched_event)
+
+        # Hand the batch to the WebSocket layer, which serializes once per
+        # interested topic and fans out through the subscription index
+        if processed and self.websocket_handler:
+            await self.websocket_handler.broadcast_connection_batch(processed)
+
     async def process_connection_event(self, event: Dict[str, Any]):
         """Process a single connection event from eBPF"""
-        try:
-            async with self.lock:
-                # Generate unique connection ID
-                conn_id = f"{event['timestamp']}_{event['pid']}_{event['saddr']}_{event['sport']}_{event['daddr']}_{event['dport']}"
-
-                # Enrich event with additional information
-                enriched_event = await self.enrich_connection_event(event)
+        enriched_event = await self._process_event(event)
 
-                # Store connection
-                self.connections[conn_id] = enriched_event
-                self.connection_queue.append(conn_id)
+        # Broadcast the new connection event to all clients
+        if enriched_event is not None and self.websocket_handler:
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Broadcasting new connection: %s", enriched_event)
+            await self.websocket_handler.broadcast_connection(enriched_event)
 
-                # Update statistics
-                await self.update_statistics(enriched_event)
-
-                # Perform threat analysis
-                if self.threat_detector:
-                    threat_score = self.threat_detector.analyze_connection(enriched_event)
-                    enriched_event['threat_score'] = threat_score
-                    enriched_event['is_suspicious'] = threat_score >= 50
-                else:
-                    enriched_event['threat_score'] = 0
-                    enriched_event['is_suspicious'] = False
-
-                self.total_connections += 1
+    async def _process_event(self, event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Enrich, score and store one connection event"""
+        try:
+            # Enrich event with additional information
+            enriched_event = self.enrich_connection_event(event)
 
-                # Log new suspicious connection
-                if enriched_event['is_suspicious']:
-                    logger.info(f"Suspicious connection detected: PID={event['pid']}, Dst={self.format_ip(event['daddr'])}:{event['dport']}")
+            # Update statistics
+            await self.update_statistics(enriched_event)
 
-                # Broadcast the new connection event to all clients
-                if self.websocket_handler:
-                    logger.info(f"Broadcasting new connection: {enriched_event}")
-                    await self.websocket_handler.broadcast_connection(enriched_event)
+            # Perform threat analysis
+            if self.threat_detector:
+                threat_score = self.threat_detector.analyze_connection(enriched_event)
+                enriched_event['threat_score'] = threat_score
+                enriched_event['is_suspicious'] = threat_score >= 50
+            else:
+                enriched_event['threat_score'] = 0
+                enriched_event['is_suspicious'] = False
+
+            # Store into the ring buffer (oldest entry is overwritten once
+            # the buffer wraps)
+            pos = self._write_idx % self.max_connections
+            if self._valid[pos]:
+                # Overwriting a live slot: retire it from the counters
+                self._active_count -= 1
+                if self._susp[pos]:
+                    self._suspicious_count -= 1
+            self._ts[pos] = event['timestamp']
+            self._pid[pos] = event['pid']
+            self._daddr[pos] = event['daddr']
+            self._dport[pos] = event['dport']
+            self._susp[pos] = enriched_event['is_suspicious']
+            self._valid[pos] = True
+            self._events[pos] = enriched_event
+            # Stable per-connection identifier: the monotonic write index is
+            # unique and costs one int, unlike the old 6-part f-string key
+            enriched_event['conn_id'] = self._write_idx
+            self._write_idx += 1
+
+            self._active_count += 1
+            if enriched_event['is_suspicious']:
+                self._suspicious_count += 1
+
+            self.total_connections += 1
+
+            # Log new suspicious connection (lazy formatting keeps the hot
+            # path free of string building when INFO is disabled)
+            if enriched_event['is_suspicious'] and logger.isEnabledFor(logging.INFO):
+                logger.info("Suspicious connection detected: PID=%d, Dst=%s:%d",
+                            event['pid'], enriched_event['dst_ip'], event['dport'])
+
+            return enriched_event
 
         except Exception as e:
             logger.error(f"Error processing connection event: {e}")
+            return None
 
-    async def enrich_connection_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
+    def enrich_connection_event(self, event: Dict[str, Any]) -> Dict[str, Any]:
         """Enrich connection event with additional process information"""
         try:
             pid = event['pid']
-            enriched = event.copy()
+            # The event dict is built fresh per event by the eBPF loader and
+            # has no other reader, so enrich it in place instead of cloning
+            enriched = event
 
             # Convert IP addresses to string format
             enriched['src_ip'] = self.format_ip(event['saddr'])
             enriched['dst_ip'] = self.format_ip(event['daddr'])
             enriched['protocol_str'] = 'TCP' if event['protocol'] == 6 else f"Protocol-{event['protocol']}"
 
-            # Get detailed process information
-            try:
-                process = psutil.Process(pid)
-                enriched['process_name'] = process.name()
-                enriched['cmdline_full'] = ' '.join(process.cmdline())
-                enriched['exe_path'] = process.exe()
-                enriched['parent_pid'] = process.ppid()
-                enriched['username'] = process.username()
-                enriched['create_time'] = process.create_time()
-                enriched['status'] = process.status()
-            except psutil.NoSuchProcess:
-                enriched['process_name'] = f"[terminated_pid:{pid}]"
-                enriched['cmdline_full'] = event.get('cmdline', '')
-                enriched['exe_path'] = 'Unknown'
-                enriched['parent_pid'] = 0
-                enriched['username'] = 'Unknown'
-                enriched['create_time'] = 0
-                enriched['status'] = 'terminated'
-            except (psutil.AccessDenied, psutil.ZombieProcess):
-                enriched['process_name'] = event.get('comm', f'[pid:{pid}]')
-                enriched['cmdline_full'] = event.get('cmdline', '')
-                enriched['exe_path'] = 'Unknown'
-                enriched['parent_pid'] = 0
-                enriched['username'] = 'Restricted'
-                enriched['create_time'] = 0
-                enriched['status'] = 'restricted'
+            # Process metadata comes from the background sampler; a miss
+            # (process newer than the last sample) falls back to one lazy read
+            meta = self._pid_meta.get(pid)
+            if meta is None:
+                meta = self._fetch_pid_meta(pid, event)
+                self._pid_meta[pid] = meta
+            enriched.update(meta)
 
             # Add geographic info if available (placeholder for now)
             enriched['country_code'] = 'Unknown'
@@ -133,6 +206,69 @@ class ConnectionHandler:
             logger.error(f"Error enriching connection event: {e}")
             return event
 
+    def _fetch_pid_meta(self, pid: int, event: Dict[str, Any]) -> Dict[str, Any]:
+        """Read process metadata for one pid directly from procfs"""
+        try:
+            process = self._get_cached_process(pid)
+            info = process.as_dict(
+                attrs=['name', 'cmdline', 'exe', 'ppid', 'username',
+                       'create_time', 'status'],
+                ad_value='Unknown'
+            )
+            return self._meta_from_info(info)
+        except psutil.NoSuchProcess:
+            self._proc_cache.pop(pid, None)
+            return {
+                'process_name': f"[terminated_pid:{pid}]",
+                'cmdline_full': event.get('cmdline', ''),
+                'exe_path': 'Unknown',
+                'parent_pid': 0,
+                'username': 'Unknown',
+                'create_time': 0,
+                'status': 'terminated'
+            }
+        except (psutil.AccessDenied, psutil.ZombieProcess):
+            return {
+                'process_name': event.get('comm', f'[pid:{pid}]'),
+                'cmdline_full': event.get('cmdline', ''),
+                'exe_path': 'Unknown',
+                'parent_pid': 0,
+                'username': 'Restricted',
+                'create_time': 0,
+                'status': 'restricted'
+            }
+
+    @staticmethod
+    def _meta_from_info(info: Dict[str, Any]) -> Dict[str, Any]:
+        """Normalize a psutil as_dict()/process_iter() info dict"""
+        cmdline = info.get('cmdline')
+        return {
+            'process_name': info.get('name') or 'Unknown',
+            'cmdline_full': ' '.join(cmdline) if isinstance(cmdline, list) else '',
+            'exe_path': info.get('exe') or 'Unknown',
+            'parent_pid': info.get('ppid') or 0,
+            'username': info.get('username') or 'Unknown',
+            'create_time': info.get('create_time') or 0,
+            'status': info.get('status') or 'Unknown'
+        }
+
+    async def _refresh_pid_meta_loop(self):
+        """Periodically sample procfs for all processes off the hot path"""
+        while True:
+            try:
+                fresh: Dict[int, Dict[str, Any]] = {}
+                for proc in psutil.process_iter(
+                        ['pid', 'name', 'cmdline', 'exe', 'ppid', 'username',
+                         'create_time', 'status']):
+                    fresh[proc.info['pid']] = self._meta_from_info(proc.info)
+
+                # Swap atomically so readers never see a half-built dict
+                self._pid_meta = fresh
+            except Exception as e:
+                logger.error(f"Error refreshing process metadata: {e}")
+
+            await asyncio.sleep(self._pid_meta_interval)
+
     async def update_statistics(self, event: Dict[str, Any]):
         """Update internal statistics based on connection event"""
         current_time = time.time()
@@ -152,170 +288,193 @@ class ConnectionHandler:
         stats = self.process_stats[pid]
         stats['connection_count'] += 1
         stats['last_seen'] = current_time
-        stats['unique_destinations'].add(event['daddr'])
+        # Destinations stay as raw integers (formatted only when served) and
+        # the set is capped so one busy pid can't grow it unbounded
+        unique_destinations = stats['unique_destinations']
+        if len(unique_destinations) < 1024:
+            unique_destinations.add(event['daddr'])
         if event.get('is_suspicious', False):
             stats['suspicious_count'] += 1
 
         # Update IP frequency
         self.ip_frequency[event['daddr']] += 1
 
-        # Update connection rates (for rate-based threat detection)
-        self.connection_rates[pid].append(current_time)
-        # Keep only last 60 seconds for rate calculation
-        self.connection_rates[pid] = [
-            t for t in self.connection_rates[pid]
-            if current_time - t <= 60
-        ]
-
-        # Cleanup old connections periodically
-        if self.total_connections % 100 == 0:
-            await self.cleanup_old_connections()
+        # Update connection rates (for rate-based threat detection);
+        # drop stale head entries so the window trim is O(1) amortized
+        rates = self.connection_rates[pid]
+        rates.append(current_time)
+        cutoff = current_time - 60.0
+        while rates and rates[0] < cutoff:
+            rates.popleft()
+
+    async def _cleanup_loop(self):
+        """Run retention cleanup periodically, off the event hot path"""
+        while True:
+            await asyncio.sleep(self._cleanup_interval)
+            try:
+                await self.cleanup_old_connections()
+            except Exception as e:
+                logger.error(f"Error during periodic cleanup: {e}")
 
     async def cleanup_old_connections(self):
         """Remove connections older than retention period"""
         current_time = time.time()
-        cutoff_time = current_time - (self.retention_minutes * 60)
-
-        # Find old connections to remove
-        old_connections = []
-        for conn_id, event in self.connections.items():
-            event_time = event['timestamp'] / 1_000_000_000  # Convert nanoseconds to seconds
-            if event_time < cutoff_time:
-                old_connections.append(conn_id)
-
-        # Remove old connections
-        for conn_id in old_connections:
-            del self.connections[conn_id]
-
-        logger.debug(f"Cleaned up {len(old_connections)} old connections")
+        cutoff_ns = int((current_time - self.retention_minutes * 60) * 1_000_000_000)
+
+        # One vectorized pass over the timestamp column
+        old = self._valid & (self._ts < cutoff_ns)
+        old_positions = np.nonzero(old)[0]
+        for pos in old_positions:
+            self._events[pos] = None
+        self._suspicious_count -= int((old & self._susp).sum())
+        self._active_count -= len(old_positions)
+        self._valid[old] = False
+
+        # Evict per-process state not seen within the retention window so
+        # process_stats / connection_rates don't grow for the whole uptime
+        stale_cutoff = current_time - self.retention_minutes * 60
+        stale_pids = [pid for pid, stats in self.process_stats.items()
+                      if stats['last_seen'] < stale_cutoff]
+        for pid in stale_pids:
+            del self.process_stats[pid]
+            self.connection_rates.pop(pid, None)
+
+        # Cap the destination frequency map; when it overflows, keep only
+        # the most frequent half so hot destinations survive the trim
+        if len(self.ip_frequency) > self._ip_frequency_max:
+            kept = heapq.nlargest(self._ip_frequency_max // 2,
+                                  self.ip_frequency.items(),
+                                  key=lambda x: x[1])
+            self.ip_frequency = defaultdict(int, kept)
+
+        logger.debug("Cleaned up %d old connections, %d stale processes",
+                     len(old_positions), len(stale_pids))
 
     async def get_recent_connections(self, limit: int = 1000) -> List[Dict[str, Any]]:
         """Get most recent connections"""
-        async with self.lock:
-            # Get recent connection IDs
-            recent_ids = list(self.connection_queue)[-limit:]
-
-            # Return connection events
-            connections = []
-            for conn_id in recent_ids:
-                if conn_id in self.connections:
-                    connections.append(self.connections[conn_id])
-
-            # Sort by timestamp (newest first)
-            connections.sort(key=lambda x: x['timestamp'], reverse=True)
-            return connections
+        # Walk the ring backwards from the write cursor: insertion order is
+        # timestamp order, so this yields newest-first without a sort and
+        # allocates O(limit) instead of copying the whole window
+        connections = []
+        size = self.max_connections
+        oldest = max(0, self._write_idx - size)
+        for idx in range(self._write_idx - 1, oldest - 1, -1):
+            pos = idx % size
+            event = self._events[pos]
+            if event is not None:
+                connections.append(event)
+                if len(connections) >= limit:
+                    break
+        return connections
 
     async def get_process_details(self, pid: int) -> Optional[Dict[str, Any]]:
         """Get detailed information about a specific process"""
-        async with self.lock:
-            if pid not in self.process_stats:
-                return None
+        if pid not in self.process_stats:
+            return None
 
-            stats = self.process_stats[pid].copy()
+        stats = self.process_stats[pid].copy()
 
-            # Convert set to list for JSON serialization
-            stats['unique_destinations'] = list(stats['unique_destinations'])
+        # Format the integer destination set lazily, only when served
+        stats['unique_destinations'] = [
+            self.format_ip(ip) for ip in stats['unique_destinations']
+        ]
 
-            # Get all connections for this process
-            process_connections = [
-                conn for conn in self.connections.values()
-                if conn['pid'] == pid
-            ]
+        # Get all connections for this process: vectorized pid match over
+        # the pid column, then gather the enriched dicts
+        positions = np.nonzero(self._valid & (self._pid == pid))[0]
+        process_connections = [
+            self._events[pos] for pos in positions
+            if self._events[pos] is not None
+        ]
 
-            # Sort by timestamp
-            process_connections.sort(key=lambda x: x['timestamp'], reverse=True)
+        # Sort by timestamp
+        process_connections.sort(key=lambda x: x['timestamp'], reverse=True)
 
-            # Calculate rate (connections per second in last minute)
-            current_time = time.time()
-            recent_connections = [
-                t for t in self.connection_rates.get(pid, [])
-                if current_time - t <= 60
-            ]
-            stats['connection_rate_per_minute'] = len(recent_connections)
+        # Calculate rate (connections per minute); the deque is already
+        # trimmed to the 60 second window on every write
+        stats['connection_rate_per_minute'] = len(self.connection_rates.get(pid, ()))
 
-            # Add threat information
-            if self.threat_detector:
-                stats['threat_analysis'] = self.threat_detector.get_process_threat_analysis(pid)
+        # Add threat information
+        if self.threat_detector:
+            stats['threat_analysis'] = self.threat_detector.get_process_threat_analysis(pid)
 
-            return {
-                'process_info': stats,
-                'recent_connections': process_connections[:50],  # Limit to 50 most recent
-                'total_connections': len(process_connections)
-            }
+        return {
+            'process_info': stats,
+            'recent_connections': process_connections[:50],  # Limit to 50 most recent
+            'total_connections': len(process_connections)
+        }
 
     async def get_statistics(self) -> Dict[str, Any]:
         """Get overall connection statistics"""
-        async with self.lock:
-            current_time = time.time()
-            uptime = current_time - self.start_time
-
-            # Count active processes
-            active_processes = len([p for p in self.process_stats.values()
-                                  if current_time - p['last_seen'] < 300])  # Active in last 5 minutes
-
-            # Count suspicious connections
-            suspicious_count = sum(1 for conn in self.connections.values()
-                                 if conn.get('is_suspicious', False))
-
-            # Most active processes
-            top_processes = sorted(
-                self.process_stats.items(),
-                key=lambda x: x[1]['connection_count'],
-                reverse=True
-            )[:10]
-
-            # Most frequent destinations
-            top_destinations = sorted(
-                self.ip_frequency.items(),
-                key=lambda x: x[1],
-                reverse=True
-            )[:10]
-
-            return {
-                'total_connections': self.total_connections,
-                'active_connections': len(self.connections),
-                'active_processes': active_processes,
-                'suspicious_connections': suspicious_count,
-                'suspicious_percentage': (suspicious_count / len(self.connections)) * 100 if self.connections else 0,
-                'uptime_seconds': uptime,
-                'average_connections_per_second': self.total_connections / uptime if uptime > 0 else 0,
-                'top_processes': [
+        current_time = time.time()
+        uptime = current_time - self.start_time
+
+        # Count active processes
+        active_processes = len([p for p in self.process_stats.values()
+                              if current_time - p['last_seen'] < 300])  # Active in last 5 minutes
+
+        # Counters are maintained on write/evict, so no per-request scan
+        active_connections = self._active_count
+        suspicious_count = self._suspicious_count
+
+        # Most active processes / destinations: top-10 selection without
+        # materializing a full sorted copy of either population
+        top_processes = heapq.nlargest(
+            10, self.process_stats.items(),
+            key=lambda x: x[1]['connection_count']
+        )
+
+        top_destinations = heapq.nlargest(
+            10, self.ip_frequency.items(),
+            key=lambda x: x[1]
+        )
+
+        return {
+            'total_connections': self.total_connections,
+            'active_connections': active_connections,
+            'active_processes': active_processes,
+            'suspicious_connections': suspicious_count,
+            'suspicious_percentage': (suspicious_count / active_connections) * 100 if active_connections else 0,
+            'uptime_seconds': uptime,
+            'average_connections_per_second': self.total_connections / uptime if uptime > 0 else 0,
+            'top_processes': [
                 {
                     'pid': pid,
-                    **{**stats, 'unique_destinations': list(stats.get('unique_destinations', []))}
+                    'name': stats.get('name', 'Unknown'),
+                    'connection_count': stats['connection_count'],
+                    'first_seen': stats['first_seen'],
+                    'last_seen': stats['last_seen'],
+                    'suspicious_count': stats['suspicious_count'],
+                    'unique_destinations': len(stats.get('unique_destinations', ()))
                 } for pid, stats in top_processes
             ],
-                'top_destinations': [{'ip': ip, 'count': count} for ip, count in top_destinations]
-            }
+            'top_destinations': [{'ip': ip, 'count': count} for ip, count in top_destinations]
+        }
+
+    def _get_cached_process(self, pid: int) -> psutil.Process:
+        """Return a cached psutil.Process for pid, rebuilding on pid reuse"""
+        process = self._proc_cache.get(pid)
+        if process is not None:
+            # is_running() re-reads the creation time from /proc and
+            # compares it to the one captured at construction; calling
+            # create_time() here would just return the memoized value
+            if process.is_running():
+                return process
+            del self._proc_cache[pid]
+
+        process = psutil.Process(pid)
+        if len(self._proc_cache) >= self._proc_cache_max:
+            # Drop the oldest entry (insertion order) to bound memory
+            self._proc_cache.pop(next(iter(self._proc_cache)))
+        self._proc_cache[pid] = process
+        return process
 
     def format_ip(self, ip_int: int) -> str:
         """Convert integer IP address to string format"""
-        try:
-            return socket.inet_ntoa(struct.pack('!I', ip_int))
-        except:
-            return f"Invalid-IP-{ip_int}"
+        return _format_ipv4(ip_int & 0xFFFFFFFF)
 
     def is_private_ip(self, ip_int: int) -> bool:
-        """Check if IP address is in private range"""
-        try:
-            ip_str = self.format_ip(ip_int)
-
-            # Check private IP ranges
-            private_ranges = [
-                ('10.0.0.0', '10.255.255.255'),
-                ('172.16.0.0', '172.31.255.255'),
-                ('192.168.0.0', '192.168.255.255'),
-                ('127.0.0.0', '127.255.255.255')
-            ]
-
-            for start, end in private_ranges:
-                start_int = struct.unpack('!I', socket.inet_aton(start))[0]
-                end_int = struct.unpack('!I', socket.inet_aton(end))[0]
-                if start_int <= ip_int <= end_int:
-                    return True
-
-            return False
-        except:
-            return False
+        """Check if IP address is in private range (pure integer compares)"""
+        return any(start <= ip_int <= end for start, end in self._PRIVATE_RANGES)
 
 
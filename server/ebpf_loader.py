@@ -7,6 +7,7 @@ import asyncio
 import ctypes
 import logging
 import os
+import struct
 import sys
 from pathlib import Path
 from typing import Optional, Dict, Any
@@ -15,6 +16,20 @@ from bcc import BPF
 
 logger = logging.getLogger(__name__)
 
+# Fixed wire layout of struct connection_event_t (see self.c_program):
+# u64 timestamp, u32 pid, char comm[16], char cmdline[256],
+# u32 saddr, u32 daddr, u16 sport, u16 dport, u8 protocol.
+# Field offsets are naturally aligned, so the packed '=' layout matches.
+_EVENT = struct.Struct('=QI16s256sIIHHB')
+
+
+def _cstr(raw: bytes) -> str:
+    """Decode a NUL-padded C char array to str"""
+    end = raw.find(b'\x00')
+    if end >= 0:
+        raw = raw[:end]
+    return raw.decode('utf-8', errors='ignore')
+
 class EBPFLoader:
     """Manages eBPF program lifecycle using BCC"""
 
@@ -25,6 +40,10 @@ class EBPFLoader:
         self.retry_count = 0
         self.max_retries = 3
 
+        # Events drained from the perf buffer in the current poll pass;
+        # dispatched to the connection handler as one batch per pass
+        self._pending_batch: list = []
+
         # Paths
         self.ebpf_dir = Path(__file__).parent.parent / "ebpf"
         self.c_file = self.ebpf_dir / "network_monitor.c"
@@ -51,7 +70,8 @@ struct connection_event_t {
     u8 protocol;
 };
 
-BPF_PERF_OUTPUT(connections);
+// Single shared MPSC ring (kernel 5.8+) instead of per-CPU perf buffers
+BPF_RINGBUF_OUTPUT(connections, 64);
 
 static __always_inline u32 get_ip_from_sock(struct sock *sk) {
     u32 saddr;
@@ -97,7 +117,7 @@ int trace_tcp_connect(struct pt_regs *ctx) {
     bpf_get_current_comm(&event.comm, sizeof(event.comm));
     __builtin_memcpy(event.cmdline, event.comm, MAX_COMM_LEN);
 
-    connections.perf_submit(ctx, &event, sizeof(event));
+    connections.ringbuf_output(&event, sizeof(event), 0);
     return 0;
 }
 
@@ -106,84 +126,101 @@ int trace_tcp_connect(struct pt_regs *ctx) {
 
     async def load_and_attach(self) -> bool:
         """Load and attach eBPF program to kernel"""
-        try:
-            logger.info("Loading eBPF program...")
-
-            # Check if running as root
-            if os.geteuid() != 0:
-                logger.warning("eBPF program requires root privileges. Running without network monitoring.")
-                return False
+        logger.info("Loading eBPF program...")
 
-            # Initialize BPF program
-            self.bpf = BPF(text=self.c_program)
+        # Check if running as root
+        if os.geteuid() != 0:
+            logger.warning("eBPF program requires root privileges. Running without network monitoring.")
+            return False
 
-            # Attach to the tcp_connect kprobe
-            self.bpf.attach_kprobe(event="tcp_connect", fn_name="trace_tcp_connect")
-            logger.info("Attached to tcp_connect kprobe")
+        while True:
+            try:
+                # Compilation is idempotent: the Clang/LLVM pass runs at most
+                # once, and attach retries reuse the compiled program
+                self._compile()
+                self._attach()
 
-            # Setup perf buffer for data reception
-            self.bpf["connections"].open_perf_buffer(
-                self.handle_connection_event,
-                page_cnt=64
-            )
+                # Start background task to drain the ring buffer
+                asyncio.create_task(self.poll_ring_buffer())
 
-            # Start background task to poll perf buffer
-            asyncio.create_task(self.poll_perf_buffer())
+                self.loaded = True
+                logger.info("eBPF program loaded and attached successfully")
+                return True
 
-            self.loaded = True
-            logger.info("eBPF program loaded and attached successfully")
-            return True
+            except Exception as e:
+                logger.error(f"Failed to load eBPF program: {e}")
+                self.retry_count += 1
 
-        except Exception as e:
-            logger.error(f"Failed to load eBPF program: {e}")
-            self.retry_count += 1
+                if self.retry_count >= self.max_retries:
+                    logger.error("Max retries reached. Giving up.")
+                    return False
 
-            if self.retry_count < self.max_retries:
                 logger.info(f"Retrying in 2 seconds... (attempt {self.retry_count + 1}/{self.max_retries})")
                 await asyncio.sleep(2)
-                return await self.load_and_attach()
-            else:
-                logger.error("Max retries reached. Giving up.")
-                return False
 
-    def handle_connection_event(self, cpu, data, size):
-        """Handle connection events from eBPF program"""
+    def _compile(self):
+        """Compile the BPF program once; later retries skip recompilation"""
+        if self.bpf is None:
+            self.bpf = BPF(text=self.c_program)
+
+    def _attach(self):
+        """Attach the compiled program and open the event ring buffer"""
+        # Attach to the tcp_connect kprobe
+        self.bpf.attach_kprobe(event="tcp_connect", fn_name="trace_tcp_connect")
+        logger.info("Attached to tcp_connect kprobe")
+
+        # Setup ring buffer for data reception
+        self.bpf["connections"].open_ring_buffer(
+            self.handle_connection_event
+        )
+
+    def handle_connection_event(self, ctx, data, size):
+        """Handle connection events from the eBPF ring buffer"""
         try:
-            # Parse the event data
-            event = self.bpf["connections"].event(data)
+            # Decode the fixed-layout struct in one unpack instead of going
+            # through BCC's generated ctypes property getters
+            ts, pid, comm, cmdline, saddr, daddr, sport, dport, protocol = \
+                _EVENT.unpack_from(ctypes.string_at(data, _EVENT.size))
 
-            # Convert to dictionary format
             event_dict = {
-                'timestamp': event.timestamp,
-                'pid': event.pid,
-                'comm': event.comm.decode('utf-8', errors='ignore').rstrip('\x00'),
-                'cmdline': event.cmdline.decode('utf-8', errors='ignore').rstrip('\x00'),
-                'saddr': event.saddr,
-                'daddr': event.daddr,
-                'sport': event.sport,
-                'dport': event.dport,
-                'protocol': event.protocol
+                'timestamp': ts,
+                'pid': pid,
+                'comm': _cstr(comm),
+                'cmdline': _cstr(cmdline),
+                'saddr': saddr,
+                'daddr': daddr,
+                'sport': sport,
+                'dport': dport,
+                'protocol': protocol
             }
 
-            # Forward to connection handler
-            if self.connection_handler:
-                asyncio.create_task(
-                    self.connection_handler.process_connection_event(event_dict)
-                )
+            # Collect for batched dispatch after the poll pass completes
+            self._pending_batch.append(event_dict)
 
         except Exception as e:
             logger.error(f"Error processing eBPF event: {e}")
 
-    async def poll_perf_buffer(self):
-        """Background task to poll perf buffer for events"""
+    async def poll_ring_buffer(self):
+        """Background task to drain the ring buffer for events"""
         while self.loaded:
             try:
-                self.bpf.perf_buffer_poll(100)  # 100ms timeout
+                # Consume whatever is available without blocking; the single
+                # shared ring replaces the per-CPU perf buffer copies
+                self.bpf.ring_buffer_consume()
+
+                # Dispatch everything drained in this pass as a single task
+                # instead of one task per event
+                if self._pending_batch and self.connection_handler:
+                    batch, self._pending_batch = self._pending_batch, []
+                    asyncio.create_task(
+                        self.connection_handler.process_batch(batch)
+                    )
+
                 await asyncio.sleep(0.001)  # Yield to event loop
             except Exception as e:
                 if not self.loaded:  # Expected during shutdown
                     break
-                logger.error(f"Error polling perf buffer: {e}")
+                logger.error(f"Error polling ring buffer: {e}")
                 await asyncio.sleep(0.1)
 
     async def cleanup(self):
@@ -194,7 +231,7 @@ int trace_tcp_connect(struct pt_regs *ctx) {
 
         if self.bpf:
             try:
-                # Cleanup perf buffer
+                # Cleanup ring buffer
                 if "connections" in self.bpf:
                     self.bpf["connections"].close()
 
@@ -219,7 +256,7 @@ int trace_tcp_connect(struct pt_regs *ctx) {
             return {
                 "loaded": True,
                 "retry_count": self.retry_count,
-                "perf_buffer_active": "connections" in self.bpf if self.bpf else False
+                "ring_buffer_active": "connections" in self.bpf if self.bpf else False
             }
         except Exception as e:
             logger.error(f"Error getting eBPF statistics: {e}")
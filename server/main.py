@@ -14,9 +14,14 @@ from typing import Dict, List, Optional
 
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 import uvicorn
 
+try:
+    import uvloop
+except ImportError:  # uvloop is Linux-only and optional
+    uvloop = None
+
 # Add server directory to Python path for imports
 sys.path.insert(0, str(Path(__file__).parent))
 
@@ -39,7 +44,8 @@ class NetworkMonitorServer:
         self.app = FastAPI(
             title="eBPF Network Threat Visualizer",
             description="Real-time network connection monitoring with threat detection",
-            version="1.0.0"
+            version="1.0.0",
+            default_response_class=ORJSONResponse
         )
 
         # Configuration
@@ -211,7 +217,9 @@ class NetworkMonitorServer:
             app=self.app,
             host="127.0.0.1",
             port=self.port,
-            log_level="info"
+            log_level="info",
+            loop="uvloop" if uvloop else "asyncio",
+            http="httptools"
         )
 
         server = uvicorn.Server(config)
@@ -230,4 +238,6 @@ async def main():
     await server.run()
 
 if __name__ == "__main__":
+    if uvloop:
+        uvloop.install()
     asyncio.run(main())
\ No newline at end of file
@@ -4,45 +4,121 @@ Analyzes network connections for suspicious patterns using rule-based and ML app
 """
 
 import logging
+import re
+import socket
 import time
-from collections import defaultdict, deque
-from datetime import datetime
+from collections import Counter, defaultdict, deque
 from typing import Dict, List, Any, Set, Optional
 import numpy as np
 
+from threat_detector_numba import score_rules
+
 logger = logging.getLogger(__name__)
 
+# Entries of per-process connection history kept per pid
+_HISTORY_CAPACITY = 100
+
+
+class _PidHistory:
+    """Fixed-size per-process connection history in struct-of-arrays layout
+
+    Timestamps, ports and interned destination-IP ids live in parallel numpy
+    arrays written through a ring cursor, so windowed aggregations are
+    vectorized reductions over contiguous memory instead of Python loops
+    over per-entry dicts.
+    """
+
+    __slots__ = ('ts', 'ports', 'ip_ids', 'head', 'count')
+
+    def __init__(self, capacity: int = _HISTORY_CAPACITY):
+        self.ts = np.zeros(capacity, dtype=np.float64)
+        self.ports = np.zeros(capacity, dtype=np.uint16)
+        self.ip_ids = np.zeros(capacity, dtype=np.int32)
+        self.head = 0
+        self.count = 0
+
+    def append(self, ts: float, ip_id: int, port: int):
+        self.ts[self.head] = ts
+        self.ip_ids[self.head] = ip_id
+        self.ports[self.head] = port
+        self.head = (self.head + 1) % len(self.ts)
+        if self.count < len(self.ts):
+            self.count += 1
+
+
 class ThreatDetector:
     """Detects suspicious network connections using rule-based and ML analysis"""
 
     def __init__(self):
-        # Known safe ports and IPs
-        self.safe_ports = {80, 443, 22, 53, 25, 587, 993, 995, 21, 110, 143, 8080, 8443, 9418}
-        self.common_dns_servers = {
+        # Known safe ports and IPs. These never change after construction,
+        # so they are frozensets: the membership tests are the hot path and
+        # immutability makes that intent explicit.
+        self.safe_ports = frozenset({80, 443, 22, 53, 25, 587, 993, 995, 21, 110, 143, 8080, 8443, 9418})
+        self.common_dns_servers = frozenset({
             '8.8.8.8', '8.8.4.4',    # Google
             '1.1.1.1', '1.0.0.1',    # Cloudflare
             '208.67.222.222',        # OpenDNS
             '9.9.9.9', '149.112.112.112'  # Quad9
-        }
+        })
 
-        # Tracking data structures
+        # Tracking data structures. Destination IPs are keyed by their
+        # packed uint32 value (single-word hash) with a string fallback for
+        # anything that doesn't parse as IPv4.
         self.ip_frequency = defaultdict(int)
-        self.process_connection_history = defaultdict(lambda: deque(maxlen=100))
+        self.process_connection_history: Dict[int, _PidHistory] = defaultdict(_PidHistory)
+        self._ip_intern: Dict[Any, int] = {}  # packed ip key -> dense int id
+        self._common_dns_keys = frozenset(
+            int.from_bytes(socket.inet_aton(ip), 'big')
+            for ip in self.common_dns_servers
+        )
         self.first_time_ips = set()
         self.process_first_connection = set()
 
         # Suspicious indicators
-        self.suspicious_countries = {'CN', 'RU', 'KP', 'IR'}  # Country codes
-        self.suspicious_ports = {1337, 31337, 4444, 5555, 6667, 12345, 54321}
+        self.suspicious_countries = frozenset({'CN', 'RU', 'KP', 'IR'})  # Country codes
+        self.suspicious_ports = frozenset({1337, 31337, 4444, 5555, 6667, 12345, 54321})
+        # Array mirrors of the port sets so batch analysis can run the
+        # membership tests vectorized over a whole drained batch at once
+        self._safe_ports_arr = np.fromiter(
+            sorted(self.safe_ports), np.int32, len(self.safe_ports))
+        self._suspicious_ports_arr = np.fromiter(
+            sorted(self.suspicious_ports), np.int32, len(self.suspicious_ports))
+        self.suspicious_process_names = frozenset({'nc', 'ncat', 'netcat', 'python', 'perl', 'bash', 'sh'})
+        self.suspicious_args = frozenset({'-e', '--execute', '/bin/sh', '/bin/bash', 'reverse', 'shell'})
+        self.system_processes = frozenset({'systemd', 'kernel', 'init', 'kthreadd'})
+
+        # Precompiled alternations so each string is scanned once in C
+        # instead of once per candidate substring
+        self._re_sus_names = re.compile(
+            '|'.join(map(re.escape, sorted(self.suspicious_process_names))))
+        self._re_sus_args = re.compile(
+            '|'.join(map(re.escape, sorted(self.suspicious_args))))
+        self._re_tmp_path = re.compile(r'/(?:var/)?tmp/')
 
         # Statistics
         self.total_analyzed = 0
         self.suspicious_detected = 0
         self.start_time = time.time()
 
-        # ML model placeholder (simplified for initial implementation)
-        self.connection_features = []
+        # ML model placeholder (simplified for initial implementation).
+        # Features live in a preallocated ring buffer whose head wraps in
+        # place, so there is no periodic "keep the last half" list slice:
+        # eviction is O(1) per append with no reallocation or GC spike.
         self.anomaly_threshold = 0.7
+        self._feat_capacity = 10000
+        self._feat_buf = np.empty((self._feat_capacity, 8), dtype=np.float32)
+        # Window statistics via Welford's algorithm: mean and M2 (sum of
+        # squared deviations) updated incrementally, with the reverse update
+        # applied when the ring evicts a row. Numerically stabler than raw
+        # sum / sum-of-squares accumulators.
+        self._feat_mean = np.zeros(8, dtype=np.float64)
+        self._feat_m2 = np.zeros(8, dtype=np.float64)
+        self._feat_count = 0
+        self._feat_head = 0
+        # Reused per-event feature row; consumed synchronously, the ring
+        # copy in _add_feature_row is what persists
+        self._feat_scratch = np.empty(8, dtype=np.float32)
+        self._z_scratch = np.empty(8, dtype=np.float64)
 
     def analyze_connection(self, event: Dict[str, Any]) -> int:
         """
@@ -55,329 +131,274 @@ class ThreatDetector:
         75-89: High risk (very suspicious)
         90-100: Critical (likely malicious)
         """
-        try:
-            self.total_analyzed += 1
-            threat_score = 0
-
-            # Update tracking data
-            dst_ip = event.get('dst_ip', '')
-            pid = event.get('pid', 0)
-            dst_port = event.get('dport', 0)
-            current_time = time.time()
-
-            # Track IP frequency
-            self.ip_frequency[dst_ip] += 1
-
-            # Track process connection history
-            self.process_connection_history[pid].append({
-                'timestamp': current_time,
-                'dst_ip': dst_ip,
-                'dst_port': dst_port
-            })
-
-            # Apply threat detection rules
-            threat_score += self._check_destination_rarity(event)
-            threat_score += self._check_connection_frequency(event)
-            threat_score += self._check_suspicious_ports(event)
-            threat_score += self._check_unusual_timing(event)
-            threat_score += self._check_first_time_process(event)
-            threat_score += self._check_geographic_anomalies(event)
-            threat_score += self._check_process_anomalies(event)
-            threat_score += self._check_connection_patterns(event)
-
-            # Apply ML-based anomaly detection
-            ml_score = self._ml_anomaly_detection(event)
-            threat_score = max(threat_score, ml_score * 50)  # Weight ML score
-
-            # Cap at 100
-            threat_score = min(100, max(0, threat_score))
-
-            # Track suspicious connections
-            if threat_score >= 50:
-                self.suspicious_detected += 1
-                logger.info(f"Suspicious connection detected (score: {threat_score}): "
-                           f"PID={pid}, Dest={dst_ip}:{dst_port}, Process={event.get('process_name', 'Unknown')}")
-
-            return int(threat_score)
-
-        except Exception as e:
-            logger.error(f"Error analyzing connection: {e}")
-            return 25  # Default to low risk on error
-
-    def _check_destination_rarity(self, event: Dict[str, Any]) -> int:
-        """Check if destination IP is rare or unknown"""
-        score = 0
-        dst_ip = event.get('dst_ip', '')
-
-        if not dst_ip:
-            return 0
-
-        # Very common destinations get 0 points
-        if dst_ip in self.common_dns_servers:
-            return 0
-
-        # Calculate IP rarity score
-        total_connections = self.total_analyzed
-        ip_count = self.ip_frequency[dst_ip]
-
-        if total_connections < 10:  # Not enough data
-            return 0
-
-        ip_frequency = ip_count / total_connections
-
-        # Rare IP (<0.1% of all connections)
-        if ip_frequency < 0.001:
-            score += 20
-        elif ip_frequency < 0.005:  # Uncommon IP (<0.5% of connections)
-            score += 10
-        elif ip_frequency < 0.01:   # Slightly uncommon (<1% of connections)
-            score += 5
-
-        return score
-
-    def _check_connection_frequency(self, event: Dict[str, Any]) -> int:
-        """Check for unusually high connection frequency"""
-        score = 0
-        pid = event.get('pid', 0)
-        current_time = time.time()
-
-        # Get recent connections for this process (last 60 seconds)
-        recent_connections = [
-            conn for conn in self.process_connection_history[pid]
-            if current_time - conn['timestamp'] <= 60
-        ]
-
-        connection_rate = len(recent_connections)
-
-        # High frequency connections
-        if connection_rate > 100:  # >100 connections/minute
-            score += 25
-        elif connection_rate > 50:   # >50 connections/minute
-            score += 15
-        elif connection_rate > 20:   # >20 connections/minute
-            score += 10
-        elif connection_rate > 10:   # >10 connections/minute
-            score += 5
-
-        # Check for connection bursts
-        if len(recent_connections) >= 3:
-            # Check if multiple connections to same destination
-            dst_counts = defaultdict(int)
-            for conn in recent_connections:
-                dst_counts[conn['dst_ip']] += 1
-
-            max_dst_count = max(dst_counts.values())
-            if max_dst_count > 20:  # Many connections to same destination
-                score += 15
-
-        return score
-
-    def _check_suspicious_ports(self, event: Dict[str, Any]) -> int:
-        """Check connections to suspicious ports"""
-        score = 0
         dst_port = event.get('dport', 0)
+        # Derive wall-clock fields once per event; the rule scorer and
+        # feature extractor both need them and localtime is cheaper
+        # than building datetime objects
+        current_time = time.time()
+        local_time = time.localtime(current_time)
+        return self._analyze_one(event, current_time,
+                                 local_time.tm_hour, local_time.tm_wday,
+                                 dst_port in self.suspicious_ports,
+                                 dst_port in self.safe_ports)
 
-        # Check if it's a known suspicious port
-        if dst_port in self.suspicious_ports:
-            score += 30
-
-        # Check if it's an unusual high port
-        if dst_port > 49152 and dst_port not in self.safe_ports:
-            score += 10  # High dynamic port
-
-        # Check for non-standard service ports
-        if dst_port not in self.safe_ports and dst_port < 1024:
-            score += 15
-
-        return score
-
-    def _check_unusual_timing(self, event: Dict[str, Any]) -> int:
-        """Check for connections at unusual times"""
-        score = 0
-        current_hour = datetime.now().hour
-
-        # Late night connections (2AM - 6AM)
-        if 2 <= current_hour <= 6:
-            score += 10
-
-        # Weekend connections to unusual destinations
-        if datetime.now().weekday() >= 5:  # Saturday or Sunday
-            dst_port = event.get('dport', 0)
-            if dst_port not in self.safe_ports:
-                score += 5
+    def analyze_connections(self, events: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Analyze a batch of connection events, returning one score per event
 
-        return score
+        Batch-invariant work is hoisted out of the loop: the wall clock is
+        read once, and the port-set membership tests run as vectorized
+        np.isin over the whole batch. The windowed per-process rules stay
+        per event because each one reads and mutates its pid's history ring.
+        """
+        n = len(events)
+        scores = np.zeros(n, dtype=np.int32)
+        if n == 0:
+            return scores
 
-    def _check_first_time_process(self, event: Dict[str, Any]) -> int:
-        """Check if this is the first network connection from a process"""
-        score = 0
-        pid = event.get('pid', 0)
+        current_time = time.time()
+        local_time = time.localtime(current_time)
+        hour = local_time.tm_hour
+        weekday = local_time.tm_wday
+
+        dports = np.fromiter(
+            (e.get('dport', 0) for e in events), np.int32, n)
+        is_susp = np.isin(dports, self._suspicious_ports_arr)
+        is_safe = np.isin(dports, self._safe_ports_arr)
+
+        for i, event in enumerate(events):
+            scores[i] = self._analyze_one(event, current_time, hour, weekday,
+                                          bool(is_susp[i]), bool(is_safe[i]))
+        return scores
+
+    def _analyze_one(self, event: Dict[str, Any], current_time: float,
+                     hour: int, weekday: int, is_suspicious_port: bool,
+                     is_safe_port: bool) -> int:
+        """Score one event given precomputed time and port-set flags
+
+        No try/except here: the producer boundary (the connection handler's
+        event loop) already catches and logs per-event failures, and a broad
+        catch in the hot path only hides bugs while paying unwind costs.
+        """
+        self.total_analyzed += 1
+        threat_score = 0
 
-        if pid not in self.process_first_connection:
-            self.process_first_connection.add(pid)
+        dst_ip, pid, dst_port = self._sanitize(event)
 
-            # Check if it's a system process making its first connection
-            process_name = event.get('process_name', '').lower()
-            system_processes = {'systemd', 'kernel', 'init', 'kthreadd'}
+        # Track IP frequency under the packed uint32 key
+        if dst_ip:
+            try:
+                ip_key: Any = int.from_bytes(socket.inet_aton(dst_ip), 'big')
+            except OSError:
+                ip_key = dst_ip  # non-IPv4 destination; keep the string
+        else:
+            ip_key = ''
+        self.ip_frequency[ip_key] += 1
+
+        # Track process connection history (interned IP id, SoA ring).
+        # Look the ring up once here and pass it down; reading through
+        # the defaultdict elsewhere would silently create empty entries.
+        ip_id = self._ip_intern.setdefault(ip_key, len(self._ip_intern))
+        history = self.process_connection_history[pid]
+        history.append(current_time, ip_id, dst_port)
+
+        # Apply all threat detection rules in one fused kernel call
+        threat_score += self._score_rules(event, ip_key, pid, dst_port,
+                                          history, current_time, hour, weekday,
+                                          is_suspicious_port, is_safe_port)
+
+        # Apply ML-based anomaly detection. Skip it when the rules alone
+        # already max the score: the ML weight (0-50) can't raise a
+        # score that is >= 100, and this path is the most expensive
+        if threat_score < 100:
+            ml_score = self._ml_anomaly_detection(event, hour, weekday)
+            threat_score = max(threat_score, ml_score * 50)  # Weight ML score
 
-            if process_name in system_processes:
-                score += 30  # System processes shouldn't make network connections
+        # Cap at 100
+        threat_score = min(100, max(0, threat_score))
+
+        # Track suspicious connections
+        if threat_score >= 50:
+            self.suspicious_detected += 1
+            logger.info(f"Suspicious connection detected (score: {threat_score}): "
+                       f"PID={pid}, Dest={dst_ip}:{dst_port}, Process={event.get('process_name', 'Unknown')}")
+
+        return int(threat_score)
+
+    @staticmethod
+    def _sanitize(event: Dict[str, Any]):
+        """Coerce the fields the rules depend on into guaranteed types"""
+        return (event.get('dst_ip') or '',
+                int(event.get('pid') or 0),
+                int(event.get('dport') or 0))
+
+    def _score_rules(self, event: Dict[str, Any], ip_key: Any, pid: int,
+                     dst_port: int, history: _PidHistory, current_time: float,
+                     hour: int, weekday: int, is_suspicious_port: bool,
+                     is_safe_port: bool) -> int:
+        """Prepare scalar rule inputs and evaluate them in one kernel call"""
+        # Destination rarity: negative ratio means "not enough data"
+        is_common_dns = ip_key in self._common_dns_keys
+        if ip_key != '' and self.total_analyzed >= 10:
+            ip_freq_ratio = self.ip_frequency[ip_key] / self.total_analyzed
+        else:
+            ip_freq_ratio = -1.0
+
+        # Windowed history aggregates for this process: vectorized
+        # reductions over the SoA ring columns (bound to locals once; the
+        # block below reads them repeatedly)
+        n = history.count
+        ip_ids = history.ip_ids
+        ts_view = history.ts[:n]
+        in_60s = ts_view >= current_time - 60
+        rate_60s = int(in_60s.sum())
+
+        max_dst_count = 0
+        if rate_60s >= 3:
+            # Counter is C-implemented and sized by the <=100-entry window;
+            # np.bincount would allocate max(id)+1 slots, which grows with
+            # the global intern table rather than the window
+            ids_60s = ip_ids[:n][in_60s]
+            max_dst_count = Counter(ids_60s.tolist()).most_common(1)[0][1]
+
+        unique_dst_count = int(np.unique(ip_ids[:n]).size)
+
+        ports_30s = history.ports[:n][ts_view >= current_time - 30]
+        seq_port_run = 0
+        if ports_30s.size >= 5:
+            # Longest run of consecutive ports, fully vectorized: mark
+            # adjacent +1 steps, then measure the longest stretch of marks
+            # via run-length edges on the padded mask
+            steps = np.diff(np.sort(ports_30s).astype(np.int32)) == 1
+            if steps.any():
+                padded = np.concatenate(([0], steps.astype(np.int8), [0]))
+                edges = np.diff(padded)
+                run_starts = np.nonzero(edges == 1)[0]
+                run_ends = np.nonzero(edges == -1)[0]
+                seq_port_run = int((run_ends - run_starts).max()) + 1
             else:
-                score += 15  # First connection is moderately suspicious
-
-        return score
-
-    def _check_geographic_anomalies(self, event: Dict[str, Any]) -> int:
-        """Check for connections to unusual geographic locations"""
-        score = 0
+                seq_port_run = 1
 
-        # This is a placeholder - in a real implementation, you would use
-        # a geoIP database to determine the country of the destination IP
-        dst_ip = event.get('dst_ip', '')
-
-        # For now, just check if it's a private IP (less suspicious)
-        if event.get('is_private', False):
-            return 0
-
-        # Add placeholder score for non-private IPs
-        # In real implementation, you'd check country codes against self.suspicious_countries
-        score += 5
-
-        return score
+        # First connection from this process?
+        is_first_conn = pid not in self.process_first_connection
+        if is_first_conn:
+            self.process_first_connection.add(pid)
 
-    def _check_process_anomalies(self, event: Dict[str, Any]) -> int:
-        """Check for suspicious process characteristics"""
-        score = 0
+        # String-derived flags (kept in Python; the kernel is numeric only)
         process_name = event.get('process_name', '').lower()
         cmdline = event.get('cmdline_full', '').lower()
         exe_path = event.get('exe_path', '').lower()
-
-        # Suspicious process names
-        suspicious_names = {'nc', 'ncat', 'netcat', 'python', 'perl', 'bash', 'sh'}
-        if any(sus_name in process_name for sus_name in suspicious_names):
-            score += 20
-
-        # Check for suspicious command line arguments
-        suspicious_args = {'-e', '--execute', '/bin/sh', '/bin/bash', 'reverse', 'shell'}
-        if any(sus_arg in cmdline for sus_arg in suspicious_args):
-            score += 25
-
-        # Check if executable is in temporary directory
-        if '/tmp/' in exe_path or '/var/tmp/' in exe_path:
-            score += 30
-
-        # Check for hidden executables
-        if exe_path and exe_path.startswith('/.'):
-            score += 20
-
-        return score
-
-    def _check_connection_patterns(self, event: Dict[str, Any]) -> int:
-        """Check for unusual connection patterns"""
-        score = 0
-        pid = event.get('pid', 0)
-        dst_ip = event.get('dst_ip', '')
-
-        # Check if process connects to many different destinations
-        if pid in self.process_connection_history:
-            unique_destinations = set(conn['dst_ip'] for conn in self.process_connection_history[pid])
-            if len(unique_destinations) > 50:
-                score += 15
-            elif len(unique_destinations) > 20:
-                score += 10
-            elif len(unique_destinations) > 10:
-                score += 5
-
-        # Check sequential port scanning pattern
-        recent_connections = [
-            conn for conn in self.process_connection_history[pid]
-            if time.time() - conn['timestamp'] <= 30  # Last 30 seconds
-        ]
-
-        if len(recent_connections) >= 5:
-            ports = [conn['dst_port'] for conn in recent_connections]
-            ports.sort()
-
-            # Check if ports are sequential (possible port scanning)
-            sequential_count = 1
-            for i in range(1, len(ports)):
-                if ports[i] == ports[i-1] + 1:
-                    sequential_count += 1
-                else:
-                    sequential_count = 1
-
-            if sequential_count >= 5:
-                score += 20
-
-        return score
-
-    def _ml_anomaly_detection(self, event: Dict[str, Any]) -> float:
+        name_flag = self._re_sus_names.search(process_name) is not None
+        args_flag = self._re_sus_args.search(cmdline) is not None
+        tmp_flag = self._re_tmp_path.search(exe_path) is not None
+        hidden_flag = bool(exe_path) and exe_path.startswith('/.')
+
+        return int(score_rules(
+            dst_port,
+            ip_freq_ratio,
+            is_common_dns,
+            rate_60s,
+            max_dst_count,
+            is_suspicious_port,
+            is_safe_port,
+            hour,
+            weekday,
+            is_first_conn,
+            process_name in self.system_processes,
+            name_flag,
+            args_flag,
+            tmp_flag,
+            hidden_flag,
+            bool(event.get('is_private', False)),
+            unique_dst_count,
+            seq_port_run
+        ))
+
+    def _ml_anomaly_detection(self, event: Dict[str, Any],
+                              hour: int, weekday: int) -> float:
         """
         Machine learning based anomaly detection
         Simplified version - in production, you'd use scikit-learn models
         """
-        try:
-            # Extract features for ML analysis
-            features = self._extract_features(event)
-
-            # Simple statistical anomaly detection
-            # In production, this would use IsolationForest or similar
-            if len(self.connection_features) < 100:  # Need training data
-                self.connection_features.append(features)
-                return 0.0
-
-            # Calculate statistical distance from normal patterns
-            mean_features = np.mean(self.connection_features, axis=0)
-            std_features = np.std(self.connection_features, axis=0) + 1e-8
-
-            # Z-score based anomaly detection
-            z_scores = np.abs((features - mean_features) / std_features)
-            anomaly_score = np.mean(z_scores)
-
-            # Convert to 0-1 scale (higher is more anomalous)
-            normalized_score = min(1.0, anomaly_score / 3.0)
-
-            # Add to training data if it looks normal
-            if normalized_score < self.anomaly_threshold:
-                self.connection_features.append(features)
-                # Keep feature list manageable
-                if len(self.connection_features) > 10000:
-                    self.connection_features = self.connection_features[-5000:]
-
-            return normalized_score
-
-        except Exception as e:
-            logger.error(f"ML anomaly detection error: {e}")
+        # Extract features for ML analysis
+        features = self._extract_features(event, hour, weekday)
+
+        # Simple statistical anomaly detection
+        # In production, this would use IsolationForest or similar
+        if self._feat_count < 100:  # Need training data
+            self._add_feature_row(features)
             return 0.0
 
-    def _extract_features(self, event: Dict[str, Any]) -> np.ndarray:
-        """Extract numerical features for ML analysis"""
-        features = [
-            event.get('dport', 0) / 65535.0,  # Normalized port
-            event.get('sport', 0) / 65535.0,  # Normalized source port
-            int(event.get('is_private', False)),
-            int(event.get('is_safe_port', True)),
-            len(event.get('process_name', '')) / 50.0,  # Process name length
-            len(event.get('cmdline_full', '')) / 200.0,  # Command line length
-            datetime.now().hour / 24.0,  # Time of day
-            datetime.now().weekday() / 7.0,  # Day of week
-        ]
-
-        return np.array(features)
+        # Mean/std come straight from the Welford accumulators
+        mean_features = self._feat_mean
+        variance = self._feat_m2 / self._feat_count
+        std_features = np.sqrt(np.maximum(variance, 0.0)) + 1e-8
+
+        # Z-score based anomaly detection, computed through the reused
+        # scratch vector so no per-event temporaries are allocated
+        z_scores = self._z_scratch
+        np.subtract(features, mean_features, out=z_scores)
+        np.divide(z_scores, std_features, out=z_scores)
+        np.abs(z_scores, out=z_scores)
+        anomaly_score = z_scores.mean()
+
+        # Convert to 0-1 scale (higher is more anomalous)
+        normalized_score = min(1.0, anomaly_score / 3.0)
+
+        # Add to training data if it looks normal; the ring evicts the
+        # oldest sample automatically once capacity is reached
+        if normalized_score < self.anomaly_threshold:
+            self._add_feature_row(features)
+
+        return normalized_score
+
+    def _add_feature_row(self, features: np.ndarray):
+        """Insert a feature row into the ring, keeping mean/M2 in step"""
+        if self._feat_count == self._feat_capacity:
+            # Reverse Welford update for the row the ring is about to evict
+            evicted = self._feat_buf[self._feat_head].astype(np.float64)
+            self._feat_count -= 1
+            delta = evicted - self._feat_mean
+            self._feat_mean -= delta / self._feat_count
+            self._feat_m2 -= delta * (evicted - self._feat_mean)
+
+        self._feat_buf[self._feat_head] = features
+        added = self._feat_buf[self._feat_head].astype(np.float64)
+        self._feat_count += 1
+        delta = added - self._feat_mean
+        self._feat_mean += delta / self._feat_count
+        self._feat_m2 += delta * (added - self._feat_mean)
+        self._feat_head = (self._feat_head + 1) % self._feat_capacity
+
+    def _extract_features(self, event: Dict[str, Any],
+                          hour: int, weekday: int) -> np.ndarray:
+        """Extract numerical features for ML analysis into the scratch row"""
+        buf = self._feat_scratch
+        buf[0] = event.get('dport', 0) / 65535.0  # Normalized port
+        buf[1] = event.get('sport', 0) / 65535.0  # Normalized source port
+        buf[2] = event.get('is_private', False)
+        buf[3] = event.get('is_safe_port', True)
+        buf[4] = len(event.get('process_name', '')) / 50.0  # Process name length
+        buf[5] = len(event.get('cmdline_full', '')) / 200.0  # Command line length
+        buf[6] = hour / 24.0  # Time of day
+        buf[7] = weekday / 7.0  # Day of week
+        return buf
 
     def get_process_threat_analysis(self, pid: int) -> Dict[str, Any]:
         """Get detailed threat analysis for a specific process"""
         if pid not in self.process_connection_history:
             return {"error": "Process not found"}
 
-        connections = list(self.process_connection_history[pid])
-        if not connections:
+        history = self.process_connection_history[pid]
+        if history.count == 0:
             return {"error": "No connections found"}
 
-        # Analyze connection patterns
-        unique_destinations = len(set(conn['dst_ip'] for conn in connections))
-        unique_ports = len(set(conn['dst_port'] for conn in connections))
-        connection_rate = len(connections) / max(1, (time.time() - connections[0]['timestamp']) / 60)  # per minute
+        # Analyze connection patterns straight off the ring columns
+        n = history.count
+        unique_destinations = int(np.unique(history.ip_ids[:n]).size)
+        unique_ports = int(np.unique(history.ports[:n]).size)
+        oldest_ts = float(history.ts[:n].min())
+        connection_rate = n / max(1, (time.time() - oldest_ts) / 60)  # per minute
 
         # Calculate average threat score (this would need to be tracked per connection)
         # For now, provide pattern-based analysis
@@ -407,7 +428,7 @@ class ThreatDetector:
             "risk_score": int(risk_score),
             "risk_factors": risk_factors,
             "connection_stats": {
-                "total_connections": len(connections),
+                "total_connections": n,
                 "unique_destinations": unique_destinations,
                 "unique_ports": unique_ports,
                 "connection_rate_per_minute": round(connection_rate, 2)
@@ -423,5 +444,5 @@ class ThreatDetector:
             "uptime_seconds": time.time() - self.start_time,
             "unique_ips_tracked": len(self.ip_frequency),
             "processes_tracked": len(self.process_connection_history),
-            "ml_training_samples": len(self.connection_features)
+            "ml_training_samples": self._feat_count
         }
\ No newline at end of file